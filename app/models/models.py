@@ -2,6 +2,7 @@ import asyncio
 import logging
 import os
 import tempfile
+from collections import defaultdict
 
 import matplotlib.pyplot as plt
 import pandas as pd
@@ -14,16 +15,20 @@ from tortoise.functions import Sum
 
 from app import constants as const
 from app.keyboards import cancel_kb, process_pagination_keyboard, start_kb
-from app.utils import (CategoriesSimilarity, get_this_day_filter,
-                       get_this_month_filter)
+from app.utils import (CategoriesSimilarity, CategoryIndex, format_amount,
+                       get_category_index, get_this_day_filter,
+                       get_this_month_filter, parse_amount)
 
 env_vars = dotenv_values(".env")
+CATEGORY_INDEX_PATH = env_vars.get("CATEGORY_INDEX_PATH") or "category_index"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
 
 
 class User(Model):
     id = fields.IntField(pk=True)
     telegram_id = fields.IntField(unique=True, null=False)
-    monthly_limit = fields.FloatField(default=0.0)
+    # Money is stored in minor units (kopiykas), see app.utils.parse_amount / format_amount
+    monthly_limit = fields.BigIntField(default=0)
 
     @classmethod
     async def start_command(cls, message: Message):
@@ -32,15 +37,22 @@ class User(Model):
 
     @classmethod
     async def update_monthly_limit(cls, message: Message, state: FSMContext):
-        await state.update_data(amount=message.text)
-        data = await state.get_data()
+        from main import NewMonthlyLimit
+
+        try:
+            amount = parse_amount(message.text)
+        except ValueError:
+            await message.answer(const.DIALOG_OLYX, reply_markup=cancel_kb)
+            await state.set_state(NewMonthlyLimit.amount)
+            return
+
         await state.clear()
 
         user = await cls.get(telegram_id=message.chat.id)
-        user.monthly_limit = data["amount"]
+        user.monthly_limit = amount
         await user.save()
         await message.answer(
-            f"✅ Місячний ліміт оновленно до {message.text} грн",
+            f"✅ Місячний ліміт оновленно до {format_amount(amount)} грн",
             reply_markup=start_kb,
         )
 
@@ -50,7 +62,7 @@ class Transaction(Model):
 
     id = fields.IntField(pk=True)
     user = fields.ForeignKeyField("models.User", related_name="users")
-    amount = fields.DecimalField(null=False, max_digits=8, decimal_places=2)
+    amount = fields.BigIntField(null=False)
     category = fields.TextField(null=False)
     description = fields.TextField(null=False)
     date = fields.DatetimeField(auto_now_add=True)
@@ -77,7 +89,7 @@ class Transaction(Model):
             ]
             keyboard = types.InlineKeyboardMarkup(inline_keyboard=buttons, resize_keyboard=False)
             await message.answer(
-                f'| Дата ->{r.date.strftime("%d:%m:%Y")}|\n| {r.category} {float(r.amount)}грн',
+                f'| Дата ->{r.date.strftime("%d:%m:%Y")}|\n| {r.category} {format_amount(r.amount)}грн',
                 reply_markup=keyboard,
             )
         if next:
@@ -94,7 +106,7 @@ class Transaction(Model):
         from main import FormRecord
 
         try:
-            amount = float(message.text)
+            amount = parse_amount(message.text)
         except ValueError:
             await message.answer(const.DIALOG_OLYX, reply_markup=cancel_kb)
             await state.set_state(FormRecord.amount)
@@ -129,21 +141,21 @@ class Transaction(Model):
             .group_by("user_id")
             .values("user_id", "sum")
         )
-        res = 0 if len(res) == 0 else float(res[0]["sum"])
+        res = 0 if len(res) == 0 else int(res[0]["sum"])
 
         if res == 0:
             text = "Немає даних"
 
         if user.monthly_limit < res:
             text = (
-                f"❗️Ви перевищили витрати на місяць біль ніж на {res - user.monthly_limit} грн\n"
-                f"💰Ліміт: {user.monthly_limit} грн\n"
-                f"💸Витрачено: {res} грн"
+                f"❗️Ви перевищили витрати на місяць біль ніж на {format_amount(res - user.monthly_limit)} грн\n"
+                f"💰Ліміт: {format_amount(user.monthly_limit)} грн\n"
+                f"💸Витрачено: {format_amount(res)} грн"
             )
 
         if user.monthly_limit > res:
             text = (
-                f"💸За місяць витрачено {res} грн"
+                f"💸За місяць витрачено {format_amount(res)} грн"
                 f"\n⚖️ {round(res / user.monthly_limit * 100, 2)}% від вашого місячного ліміту"
             )
         await message.answer(text, reply_markup=start_kb)
@@ -161,8 +173,7 @@ class Transaction(Model):
             return
 
         df["date"] = df["date"].dt.strftime("%d, %m, %Y")
-        df["amount"] = df["amount"].astype(float)
-        df["amount"] = df["amount"].round(2)
+        df["amount"] = df["amount"].map(format_amount)
         df.rename(
             columns={
                 "date": "Дата",
@@ -191,35 +202,34 @@ class Transaction(Model):
             .values("user_id", "sum")
         )
 
-        res = 0 if len(res) == 0 else float(res[0]["sum"])
-        text = f"💸За сьогодні витрачено {res} грн"
+        res = 0 if len(res) == 0 else int(res[0]["sum"])
+        text = f"💸За сьогодні витрачено {format_amount(res)} грн"
         await message.answer(text, reply_markup=start_kb)
 
     @classmethod
     async def month_analytics(cls, message: Message):
         user = await User.get(telegram_id=message.chat.id)
         month_filter = get_this_month_filter()
-        transactions = await Transaction.filter(user_id=user.id, **month_filter)
+        transactions = await Transaction.filter(user_id=user.id, **month_filter).values_list("category", "amount")
 
         if not transactions:
             await message.answer(const.DIALOG_NO_TRANSACTION, reply_markup=start_kb)
             return
 
         cat_names = await Transaction.filter(user_id=user.id).values_list("category", flat=True)
-        cs = CategoriesSimilarity(words=set(cat_names))
+        cs = CategoriesSimilarity(words=set(cat_names), index=get_category_index(CATEGORY_INDEX_PATH))
         categories = cs.process()
 
         # Aggregate data based on categories
         category_sums = {}
-        for transaction in transactions:
+        for cat, amount in transactions:
             await asyncio.sleep(0)
-            cat = transaction.category
             for key, values in categories.items():
                 if cat in values:
                     cat = key
                     break
 
-            category_sums[cat] = category_sums.get(cat, 0) + float(transaction.amount)
+            category_sums[cat] = category_sums.get(cat, 0) + amount
 
         # Generate a pie chart
         fig, ax = plt.subplots()
@@ -238,6 +248,19 @@ class Transaction(Model):
         await message.answer_photo(photo=FSInputFile(temp_file.name, os.path.split(temp_file.name)[1]))
         os.remove(temp_file.name)
 
+    @classmethod
+    async def rebuild_category_index(cls):
+        rows = await cls.all().distinct().values_list("category", "user_id")
+        categories = defaultdict(set)
+        for category, user_id in rows:
+            categories[category].add(user_id)
+        if len(categories) < 2:
+            return
+
+        # Heavy and CPU bound, run it from rebuild_category_index.py, not inside the bot process
+        if CategoryIndex.build(dict(categories), CATEGORY_INDEX_PATH) is None:
+            logging.info("Category index is not rebuilt: no category is shared by enough users")
+
 
 async def init():
     db_user = env_vars["DB_USER"]
@@ -252,6 +275,16 @@ async def init():
 
     await Tortoise.init(db_url=url, modules={"models": ["app.models.models"]})
     await Tortoise.generate_schemas()
+    await migrate()
+
+
+async def migrate():
+    # Plain SQL migrations, each one has to be safe to run again on every start
+    connection = Tortoise.get_connection("default")
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if name.endswith(".sql"):
+            with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                await connection.execute_script(f.read())
 
 
 if __name__ == "__main__":
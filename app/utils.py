@@ -1,11 +1,41 @@
+import json
+import logging
+import os
+import re
+import shutil
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+from typing import Optional
 
+import numpy as np
 import pymorphy2
 from sklearn.cluster import MeanShift
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 
+# At most 10 ASCII digits before the separator, so the value always fits a BIGINT column
+AMOUNT_RE = re.compile(r"^\s*([0-9]{1,10})(?:[.,]([0-9]{1,2}))?\s*$")
+
+
+def parse_amount(text: str) -> int:
+    """
+    Parse user input like `120`, `99.9` or `12,50` into minor units (kopiykas).
+    Raises ValueError for anything else, so callers can ask again.
+    """
+    match = AMOUNT_RE.match(text or "")
+    if match is None:
+        raise ValueError(f"Invalid amount: {text!r}")
+
+    units, cents = match.groups()
+    return int(units) * 100 + int((cents or "0").ljust(2, "0"))
+
+
+def format_amount(amount: int) -> str:
+    sign = "-" if amount < 0 else ""
+    units, cents = divmod(abs(int(amount)), 100)
+    return f"{sign}{units}.{cents:02d}"
+
+
 def get_this_month_filter() -> dict:
     current_datetime = datetime.now()
 
@@ -106,23 +136,32 @@ class CategoriesSimilarity:
 
         return most_common_word
 
-    def __init__(self, words: list[str]):
+    def __init__(self, words: list[str], index: Optional["CategoryIndex"] = None):
         self.words = words
+        self.index = index
         self.morph = pymorphy2.MorphAnalyzer(lang='uk')
 
-    def process(self):
-
-        product_names_uk_lemmatized = [self.lemmatize_text(self.morph, name.lower()) for name in self.words]
+    def lemmatize(self, words) -> list[str]:
+        return [self.lemmatize_text(self.morph, name.lower()) for name in words]
 
+    def fit(self, lemmatized: list[str]):
         vectorizer = TfidfVectorizer(stop_words=self.uk_stop_words)
-        X = vectorizer.fit_transform(product_names_uk_lemmatized)
+        X = vectorizer.fit_transform(lemmatized)
 
         meanshift = MeanShift()
         meanshift.fit(X.toarray())
-        labels = meanshift.labels_
+        return vectorizer, X, meanshift.labels_
+
+    def cluster(self, words: list[str], lemmatized: list[str]) -> dict:
+        if not words:
+            return {}
+        if len(words) == 1:
+            return {words[0].lower(): list(words)}
+
+        _, _, labels = self.fit(lemmatized)
 
         clusters = defaultdict(list)
-        for product, label in zip(self.words, labels):
+        for product, label in zip(words, labels):
             clusters[label].append(product)
 
         naming_clusters = defaultdict(list)
@@ -130,3 +169,213 @@ class CategoriesSimilarity:
             naming_clusters[self.most_repeated_word_simple(products).lower()] = products
 
         return dict(naming_clusters)
+
+    def process(self):
+        words = list(self.words)
+        product_names_uk_lemmatized = self.lemmatize(words)
+
+        if self.index is None:
+            return self.cluster(words, product_names_uk_lemmatized)
+
+        # Known categories go straight to the shared index, only the rest is clustered per user
+        naming_clusters = defaultdict(list)
+        rest, rest_lemmatized = [], []
+        for product, lemmatized in zip(words, product_names_uk_lemmatized):
+            canonical = self.index.assign(lemmatized)
+            if canonical is None:
+                rest.append(product)
+                rest_lemmatized.append(lemmatized)
+            else:
+                naming_clusters[canonical].append(product)
+
+        for name, products in self.cluster(rest, rest_lemmatized).items():
+            naming_clusters[name].extend(products)
+
+        return dict(naming_clusters)
+
+
+class CategoryIndex:
+    """
+    Cross-user category dictionary: canonical category -> variants.
+
+    Every build is written to its own directory with `meta.json` (terms, canonical names,
+    lemmatized variants), `idf.npy` and `centroids.npy` (terms x canonical, unit-length
+    columns); the `current` symlink is swapped atomically once a build is complete.
+    Arrays are memory-mapped on load, so a lookup only reads the rows of the query terms.
+    """
+
+    META_FILE = "meta.json"
+    IDF_FILE = "idf.npy"
+    CENTROIDS_FILE = "centroids.npy"
+    CURRENT_LINK = "current"
+    # The previous build is kept for processes that resolved the link just before the swap
+    KEEP_BUILDS = 2
+
+    def __init__(self, terms: list[str], canonical: list[str], variants: dict, idf, centroids):
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.canonical = canonical
+        self.variants = variants
+        self.idf = idf
+        self.centroids = centroids
+        self.analyzer = TfidfVectorizer(stop_words=CategoriesSimilarity.uk_stop_words).build_analyzer()
+
+    @classmethod
+    def build(
+        cls, categories: dict, path: str, min_users: int = 2, max_categories: int = 2000
+    ) -> Optional["CategoryIndex"]:
+        """
+        `categories` maps a category to the set of ids of the users who use it.
+        A cluster is kept only if its lemmatized token shared by the most users comes from
+        at least `min_users` users, so one user's free-text category never shows up in
+        somebody else's chart. It is displayed as the most used category users actually
+        typed with that token, or as the token itself if no such category is shared enough.
+
+        MeanShift is quadratic and works on a dense matrix, so categories are grouped by
+        lemma first and only the `max_categories` lemmas with the most users are clustered.
+
+        Returns None and keeps the current index when there is nothing to cluster (e.g. only
+        stop words) or no cluster is shared by enough users.
+        """
+        cs = CategoriesSimilarity(list(categories))
+        lemma_users = defaultdict(set)
+        lemma_names = defaultdict(lambda: defaultdict(set))
+        for name, lemma, users in zip(categories, cs.lemmatize(categories), categories.values()):
+            lemma_users[lemma] |= set(users)
+            lemma_names[lemma][name.lower()] |= set(users)
+
+        if len(lemma_users) > max_categories:
+            top = sorted(lemma_users, key=lambda lemma: len(lemma_users[lemma]), reverse=True)
+            keep = set(top[:max_categories])
+            lemma_users = {lemma: users for lemma, users in lemma_users.items() if lemma in keep}
+
+        lemmatized = list(lemma_users)
+        # TfidfVectorizer fails on an empty vocabulary and MeanShift needs two samples
+        analyzer = TfidfVectorizer(stop_words=cs.uk_stop_words).build_analyzer()
+        if len(lemmatized) < 2 or not any(analyzer(lemma) for lemma in lemmatized):
+            return None
+
+        vectorizer, X, labels = cs.fit(lemmatized)
+
+        clusters = defaultdict(list)
+        for i, label in enumerate(labels):
+            clusters[label].append(i)
+
+        # Clusters sharing a name are merged, same as per-user naming would do
+        named = defaultdict(list)
+        for indices in clusters.values():
+            token_users = defaultdict(set)
+            for i in indices:
+                for token in analyzer(lemmatized[i]):
+                    token_users[token] |= lemma_users[lemmatized[i]]
+            if not token_users:
+                continue
+
+            token = max(token_users, key=lambda token: len(token_users[token]))
+            if len(token_users[token]) < min_users:
+                continue
+
+            name_users = defaultdict(set)
+            for i in indices:
+                if token in analyzer(lemmatized[i]):
+                    for name, users in lemma_names[lemmatized[i]].items():
+                        name_users[name] |= users
+            name = max(name_users, key=lambda name: len(name_users[name]))
+            named[name if len(name_users[name]) >= min_users else token].extend(indices)
+
+        canonical = list(named)
+        if not canonical:
+            return None
+
+        centroids = np.zeros((len(canonical), X.shape[1]), dtype=np.float32)
+        variants = {}
+        for n, indices in enumerate(named.values()):
+            centroid = np.asarray(X[indices].mean(axis=0)).ravel()
+            norm = np.linalg.norm(centroid)
+            if norm:
+                centroids[n] = centroid / norm
+            for i in indices:
+                variants[lemmatized[i]] = n
+
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, i in vectorizer.vocabulary_.items():
+            terms[i] = term
+
+        build_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        build_path = os.path.join(path, build_id)
+        os.makedirs(build_path)
+        np.save(os.path.join(build_path, cls.IDF_FILE), vectorizer.idf_.astype(np.float32))
+        np.save(os.path.join(build_path, cls.CENTROIDS_FILE), np.ascontiguousarray(centroids.T))
+        with open(os.path.join(build_path, cls.META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"terms": terms, "canonical": canonical, "variants": variants}, f, ensure_ascii=False)
+
+        tmp_link = os.path.join(path, cls.CURRENT_LINK + ".tmp")
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(build_id, tmp_link)
+        os.replace(tmp_link, os.path.join(path, cls.CURRENT_LINK))
+
+        builds = sorted(name for name in os.listdir(path) if name.isdigit())
+        for name in builds[: -cls.KEEP_BUILDS]:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+        return cls.load(path, build_id)
+
+    @classmethod
+    def current_build(cls, path: str) -> Optional[str]:
+        try:
+            return os.readlink(os.path.join(path, cls.CURRENT_LINK))
+        except OSError:
+            return None
+
+    @classmethod
+    def load(cls, path: str, build_id: Optional[str] = None) -> "CategoryIndex":
+        build_path = os.path.join(path, build_id or cls.current_build(path))
+        with open(os.path.join(build_path, cls.META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        idf = np.load(os.path.join(build_path, cls.IDF_FILE), mmap_mode="r")
+        centroids = np.load(os.path.join(build_path, cls.CENTROIDS_FILE), mmap_mode="r")
+
+        terms, canonical = meta["terms"], meta["canonical"]
+        if idf.shape != (len(terms),) or centroids.shape != (len(terms), len(canonical)):
+            raise ValueError(f"Category index {build_path} is inconsistent")
+        return cls(terms, canonical, meta["variants"], idf, centroids)
+
+    def assign(self, lemmatized: str, threshold: float = 0.5) -> Optional[str]:
+        if not self.canonical:
+            return None
+        if lemmatized in self.variants:
+            return self.canonical[self.variants[lemmatized]]
+
+        counts = Counter(self.terms[t] for t in self.analyzer(lemmatized) if t in self.terms)
+        if not counts:
+            return None
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp)
+        weights = np.fromiter(counts.values(), dtype=np.float32) * self.idf[indices]
+        weights /= np.linalg.norm(weights)
+
+        scores = weights @ self.centroids[indices]
+        best = int(np.argmax(scores))
+        return self.canonical[best] if scores[best] >= threshold else None
+
+
+_category_indexes = {}
+
+
+def get_category_index(path: str) -> Optional[CategoryIndex]:
+    # Loaded once per process and build: the `current` link is checked on every call,
+    # so a rebuild done by another process is picked up on the next request
+    build_id = CategoryIndex.current_build(path)
+    if build_id is None:
+        return None
+
+    cached = _category_indexes.get(path)
+    if cached is None or cached[0] != build_id:
+        # The index is optional, a broken build only turns it off and analytics clusters per user
+        try:
+            cached = (build_id, CategoryIndex.load(path, build_id))
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Error loading category index {build_id}\n {e}")
+            return None
+        _category_indexes[path] = cached
+    return cached[1]
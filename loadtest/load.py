@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+from aiogram import types
+from tortoise import Tortoise
+
+from app import constants as const
+from app.actions import ACTIONS
+from loadtest.server import FakeTelegramServer
+
+CATEGORIES = ["кафе", "кава", "продукти", "магазин", "таксі", "аптека", "косметика", "кіно"]
+
+# name -> (weight, steps); a step is ("message", text) or ("callback", data)
+FLOWS = {
+    "add_record": (
+        5,
+        lambda: [
+            ("message", ACTIONS[const.ADD_RECORD]),
+            ("message", f"{random.randint(1, 2000)}.{random.randint(0, 99):02d}"),
+            ("message", random.choice(CATEGORIES)),
+        ],
+    ),
+    "report": (
+        2,
+        lambda: [
+            ("message", ACTIONS[const.MONTHLY_COSTS]),
+            ("callback", "day_analytics"),
+            ("callback", "month_analytics"),
+        ],
+    ),
+    "analytics": (1, lambda: [("message", ACTIONS[const.MONTHLY_ANALYTICS])]),
+    "csv_report": (1, lambda: [("callback", "csv_report")]),
+    "pagination": (
+        2,
+        lambda: [
+            ("message", ACTIONS[const.ALL_RECORDS]),
+            ("message", f"{const.DIALOG_RIGHT_PAGINATION}2"),
+            ("message", f"1{const.DIALOG_LEFT_PAGINATION}"),
+        ],
+    ),
+}
+
+update_ids = itertools.count(1)
+
+
+def build_update(user_id: int, kind: str, payload: str) -> types.Update:
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    message = {
+        "message_id": next(update_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": user,
+    }
+    if kind == "message":
+        return types.Update(update_id=next(update_ids), message={**message, "text": payload})
+
+    callback_query = {
+        "id": str(next(update_ids)),
+        "from": user,
+        "chat_instance": str(user_id),
+        "message": {**message, "text": "..."},
+        "data": payload,
+    }
+    return types.Update(update_id=next(update_ids), callback_query=callback_query)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class LoadGenerator:
+    def __init__(self, dp, bot, flows_per_user: int):
+        self.dp = dp
+        self.bot = bot
+        self.flows_per_user = flows_per_user
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+
+    async def step(self, flow: str, user_id: int, kind: str, payload: str) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, build_update(user_id, kind, payload))
+        except Exception as e:
+            self.errors[f"{flow}: {type(e).__name__}"] += 1
+        self.latencies[flow].append(time.perf_counter() - started)
+
+    async def simulate_user(self, user_id: int, semaphore: asyncio.Semaphore) -> None:
+        names = list(FLOWS)
+        weights = [FLOWS[name][0] for name in names]
+        async with semaphore:
+            await self.step("start", user_id, "message", "/start")
+            for flow in random.choices(names, weights, k=self.flows_per_user):
+                for kind, payload in FLOWS[flow][1]():
+                    await self.step(flow, user_id, kind, payload)
+
+    async def run(self, users: int, concurrency: int) -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(self.simulate_user(100_000 + i, semaphore) for i in range(users)))
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float, server_stats: dict) -> dict:
+        flows = {}
+        for flow, values in self.latencies.items():
+            flows[flow] = {
+                "updates": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(max(values) * 1000, 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "updates": total,
+            "updates_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+            "flows": flows,
+            "errors": dict(self.errors),
+            "api": server_stats,
+        }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['updates']} updates in {report['elapsed_s']}s -> {report['updates_per_s']} updates/s")
+    print(f"{'flow':<12}{'updates':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for flow, row in sorted(report["flows"].items()):
+        print(
+            f"{flow:<12}{row['updates']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+    print(f"API calls: {report['api']['calls']}, rate limited: {report['api']['rate_limited']}")
+    for method, count in sorted(report["api"]["methods"].items()):
+        print(f"  {method}: {count}")
+    for error, count in sorted(report["errors"].items()):
+        print(f"Error {error}: {count}")
+
+
+async def main(args) -> None:
+    server = FakeTelegramServer(args.latency, args.jitter, args.flood_ratio, args.max_rps, args.retry_after)
+    api_url = await server.start(port=args.port)
+
+    # `main` builds the bot at import time, so the environment has to be ready first
+    os.environ["BOT_API_URL"] = api_url
+    os.environ["BOT_TOKEN"] = os.environ.get("BOT_TOKEN") or "123456:LOADTEST"
+    from main import bot, dp
+
+    await Tortoise.init(db_url=args.db_url, modules={"models": ["app.models.models"]})
+    await Tortoise.generate_schemas()
+    try:
+        generator = LoadGenerator(dp, bot, args.flows)
+        elapsed = await generator.run(args.users, args.concurrency)
+        report = generator.report(elapsed, server.stats())
+    finally:
+        await bot.session.close()
+        await Tortoise.close_connections()
+        await server.stop()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay simulated users against the bot dispatcher")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--flows", type=int, default=5, help="flows per user after /start")
+    parser.add_argument("--db-url", default="sqlite://:memory:")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--flood-ratio", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
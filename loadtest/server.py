@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import web
+
+# Methods the bot calls that return a Message, everything else answers with `True`
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "sendPhoto"}
+
+
+@dataclass
+class ApiCall:
+    method: str
+    chat_id: Optional[str]
+    started: float
+    duration: float
+    status: int
+
+
+class FakeTelegramServer:
+    """
+    Local stand-in for the Telegram Bot API.
+
+    Answers `/bot<token>/<method>` like api.telegram.org does, records every call,
+    sleeps `latency` (+/- `jitter`) seconds per call and replies with 429 `retry_after`
+    either randomly (`flood_ratio`) or when more than `max_rps` calls came in the last second.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        flood_ratio: float = 0.0,
+        max_rps: int = 0,
+        retry_after: int = 1,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_ratio = flood_ratio
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.calls: list[ApiCall] = []
+        self._window = deque()
+        self._message_id = 0
+        self._runner = None
+
+    @property
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # port 0 binds a free port, report the real one
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def is_flooded(self, now: float) -> bool:
+        if self.flood_ratio and random.random() < self.flood_ratio:
+            return True
+        if not self.max_rps:
+            return False
+
+        while self._window and now - self._window[0] > 1:
+            self._window.popleft()
+        if len(self._window) >= self.max_rps:
+            return True
+        self._window.append(now)
+        return False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        method = request.match_info["method"]
+        data = await request.post()
+        chat_id = data.get("chat_id")
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if self.is_flooded(started):
+            status = 429
+            body = {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        else:
+            status = 200
+            body = {"ok": True, "result": self.result(method, chat_id)}
+
+        self.calls.append(ApiCall(method, chat_id, started, time.perf_counter() - started, status))
+        return web.json_response(body, status=status)
+
+    def result(self, method: str, chat_id: Optional[str]):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "finik", "username": "finik_bot"}
+        if method not in MESSAGE_METHODS:
+            return True
+
+        self._message_id += 1
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "private"},
+        }
+        if method == "sendDocument":
+            message["document"] = {"file_id": f"doc{self._message_id}", "file_unique_id": f"doc{self._message_id}"}
+        elif method == "sendPhoto":
+            message["photo"] = [
+                {
+                    "file_id": f"photo{self._message_id}",
+                    "file_unique_id": f"photo{self._message_id}",
+                    "width": 640,
+                    "height": 480,
+                }
+            ]
+        return message
+
+    def stats(self) -> dict:
+        return {
+            "calls": len(self.calls),
+            "methods": dict(Counter(call.method for call in self.calls)),
+            "rate_limited": sum(1 for call in self.calls if call.status == 429),
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.02, help="+/- seconds added to latency")
+    parser.add_argument("--flood-ratio", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--max-rps", type=int, default=0, help="calls per second before 429, 0 disables")
+    parser.add_argument("--retry-after", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = FakeTelegramServer(args.latency, args.jitter, args.flood_ratio, args.max_rps, args.retry_after)
+    web.run_app(server.app, host=args.host, port=args.port)
@@ -15,6 +15,8 @@ from os import getenv
 
 from aiogram import Bot, Dispatcher, F, types
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
@@ -26,10 +28,13 @@ from app import constants as const
 from app.actions import ACTIONS
 from app.keyboards import cancel_kb, start_kb
 from app.models.models import Transaction, User
+from app.utils import format_amount
 
 load_dotenv()
 
 TOKEN = getenv("BOT_TOKEN")
+# Point the bot at another Bot API server, e.g. the local fake one from `loadtest`
+API_URL = getenv("BOT_API_URL")
 
 
 class FormRecord(StatesGroup):
@@ -42,7 +47,8 @@ class NewMonthlyLimit(StatesGroup):
 
 
 dp = Dispatcher()
-bot = Bot(TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+session = AiohttpSession(api=TelegramAPIServer.from_base(API_URL)) if API_URL else None
+bot = Bot(TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
 
 @dp.message(CommandStart())
@@ -81,7 +87,7 @@ async def update_budget(message: types.Message):
     ]
     keyboard = types.InlineKeyboardMarkup(inline_keyboard=buttons)
     user = await User.get(telegram_id=message.chat.id)
-    await message.answer(f"💳Ліміт: {user.monthly_limit} грн", reply_markup=keyboard)
+    await message.answer(f"💳Ліміт: {format_amount(user.monthly_limit)} грн", reply_markup=keyboard)
 
 
 @dp.callback_query(lambda c: c.data == "change_limit")
@@ -0,0 +1,19 @@
+-- Store money as integer minor units (kopiykas) instead of NUMERIC / DOUBLE PRECISION
+DO $$
+BEGIN
+    IF (
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'transaction' AND column_name = 'amount'
+    ) = 'numeric' THEN
+        ALTER TABLE "transaction" ALTER COLUMN "amount" TYPE BIGINT USING ROUND("amount" * 100);
+    END IF;
+
+    IF (
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'user' AND column_name = 'monthly_limit'
+    ) = 'double precision' THEN
+        ALTER TABLE "user" ALTER COLUMN "monthly_limit" DROP DEFAULT;
+        ALTER TABLE "user" ALTER COLUMN "monthly_limit" TYPE BIGINT USING ROUND("monthly_limit" * 100);
+        ALTER TABLE "user" ALTER COLUMN "monthly_limit" SET DEFAULT 0;
+    END IF;
+END $$;
@@ -0,0 +1,12 @@
+from tortoise import run_async
+
+from app.models.models import Transaction, init
+
+
+async def main() -> None:
+    await init()
+    await Transaction.rebuild_category_index()
+
+
+if __name__ == "__main__":
+    run_async(main())
@@ -0,0 +1,28 @@
+import unittest
+
+from app.utils import format_amount, parse_amount
+
+
+class TestAmounts(unittest.TestCase):
+
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount("120"), 12000)
+        self.assertEqual(parse_amount("99.9"), 9990)
+        self.assertEqual(parse_amount(" 12,05 "), 1205)
+        self.assertEqual(parse_amount("0.01"), 1)
+        self.assertEqual(parse_amount("9999999999.99"), 999999999999)
+
+    def test_parse_amount_invalid(self):
+        for text in ["", "abc", "-5", "1.234", "1e3", "nan", None, "99999999999999999999", "٣", "１２"]:
+            with self.assertRaises(ValueError):
+                parse_amount(text)
+
+    def test_format_amount(self):
+        self.assertEqual(format_amount(12000), "120.00")
+        self.assertEqual(format_amount(1205), "12.05")
+        self.assertEqual(format_amount(-150), "-1.50")
+        self.assertEqual(format_amount(parse_amount("7,5")), "7.50")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 
-from app.utils import CategoriesSimilarity
+import numpy as np
+
+from app.utils import CategoriesSimilarity, CategoryIndex, get_category_index
 
 
 class TestCategoriesSimilarity(unittest.TestCase):
@@ -18,6 +22,64 @@ class TestCategoriesSimilarity(unittest.TestCase):
 
         self.assertEqual(instance.process(), expected_result)
 
+    def test_process_with_index(self):
+        # category -> ids of the users who use it
+        categories = {
+            "кафе": {1, 2, 3},
+            "кафешка": {1},
+            "кава": {2, 3},
+            "кава в кафе": {4},
+            "продукти": {1, 2},
+            "магазин": {3},
+            "Баба балувана": {4},
+        }
+        with tempfile.TemporaryDirectory() as path:
+            index = CategoryIndex.build(categories, path)
+            instance = CategoriesSimilarity(["кава", "кава з молоком", "Продукти", "баба"], index=index)
+            result = instance.process()
+
+        # Shared names are categories users typed, not lemmas ("продукти", not "продукт").
+        # "Баба балувана" is used by a single user, so it never becomes a shared name
+        expected_result = {
+            'кафе': ['кава', 'кава з молоком'],
+            'продукти': ['Продукти'],
+            'баба': ['баба'],
+        }
+        self.assertEqual(result, expected_result)
+
+    def test_build_without_shared_categories(self):
+        # every category belongs to a single user, so nothing may be published
+        categories = {"кафе": {1}, "таксі": {2}, "кава": {3}}
+        with tempfile.TemporaryDirectory() as path:
+            self.assertIsNone(CategoryIndex.build(categories, path))
+            self.assertIsNone(get_category_index(path))
+
+        index = CategoryIndex(["кафе"], [], {}, np.ones(1, dtype=np.float32), np.zeros((1, 0), dtype=np.float32))
+        self.assertIsNone(index.assign("кафе біля дому"))
+
+    def test_build_with_stop_words_only(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.assertIsNone(CategoryIndex.build({"та": {1, 2}, "і": {1, 3}}, path))
+            self.assertIsNone(get_category_index(path))
+
+    def test_get_category_index_follows_rebuilds(self):
+        categories = {"кафе": {1, 2}, "кава": {1, 2}, "продукти": {1, 2}}
+        with tempfile.TemporaryDirectory() as path:
+            self.assertIsNone(get_category_index(path))
+
+            CategoryIndex.build(categories, path)
+            index = get_category_index(path)
+            self.assertIs(get_category_index(path), index)
+
+            CategoryIndex.build(categories, path)
+            self.assertIsNot(get_category_index(path), index)
+
+    def test_get_category_index_with_missing_build(self):
+        with tempfile.TemporaryDirectory() as path:
+            os.symlink("20240101000000000000", os.path.join(path, CategoryIndex.CURRENT_LINK))
+            with self.assertLogs(level="ERROR"):
+                self.assertIsNone(get_category_index(path))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+
+from loadtest.server import FakeTelegramServer
+
+
+class TestFakeTelegramServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = FakeTelegramServer()
+        api_url = await self.server.start(port=0)
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+        self.bot = Bot("123456:TEST", session=session)
+
+    async def asyncTearDown(self):
+        await self.bot.session.close()
+        await self.server.stop()
+
+    async def test_records_calls(self):
+        message = await self.bot.send_message(42, "hello")
+
+        self.assertEqual(message.chat.id, 42)
+        self.assertEqual(self.server.stats(), {"calls": 1, "methods": {"sendMessage": 1}, "rate_limited": 0})
+
+    async def test_retry_after(self):
+        self.server.flood_ratio = 1
+        self.server.retry_after = 3
+
+        with self.assertRaises(TelegramRetryAfter) as ctx:
+            await self.bot.send_message(42, "hello")
+
+        self.assertEqual(ctx.exception.retry_after, 3)
+        self.assertEqual(self.server.stats()["rate_limited"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()